@@ -1,19 +1,21 @@
 import os
 import logging
 import time
+import threading
+import hashlib
 import requests
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError, as_completed, wait
 from cachetools import TTLCache
 from functools import wraps
 from dotenv import load_dotenv
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 import praw
 import re
 
 # Load environment variables
 load_dotenv()
 
-# Setup logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+# Module logger; handlers are configured once by the application's setup_logging
 logger = logging.getLogger(__name__)
 
 # In-memory caches with TTL (Time-To-Live)
@@ -22,6 +24,35 @@ entity_cache = TTLCache(maxsize=1000, ttl=3600)   # Cache entities for 1 hour
 web_search_cache = TTLCache(maxsize=100, ttl=300)  # Cache web searches for 5 minutes
 analysis_cache = TTLCache(maxsize=500, ttl=1800)  # Cache analyses for 30 minutes
 
+# TTLCache is not thread-safe and the caches are shared by request and source-fetcher threads,
+# so every read and write goes through this lock
+cache_lock = threading.Lock()
+
+# Placeholder texts returned when no summary could be produced (never worth caching)
+SUMMARY_FALLBACKS = frozenset([
+    "No content to summarize.",
+    "No summary available",
+    "Summarization service unavailable at the moment.",
+    "Sorry, summarization is unavailable at the moment.",
+    "No information available to summarize.",
+    "Summary service unavailable at the moment.",
+    "Sorry, I couldn't generate a summary at the moment."
+])
+
+# Placeholder texts returned when no conversational reply could be produced
+CONVERSATION_FALLBACKS = frozenset([
+    "I didn't receive any input. How can I help you today?",
+    "Conversational service unavailable at the moment.",
+    "I'm having trouble generating a response right now. Please try again later."
+])
+
+# Shared HTTP session so upstream API calls reuse keep-alive connections
+http_session = requests.Session()
+http_session.mount("https://", requests.adapters.HTTPAdapter(pool_connections=10, pool_maxsize=20))
+
+# Reddit clients are not thread-safe, so each thread keeps its own
+reddit_clients = threading.local()
+
 # API keys loaded from environment variables
 YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY")
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
@@ -36,6 +67,13 @@ HF_API_NER_MODEL = "dbmdz/bert-large-cased-finetuned-conll03-english"
 HF_API_BOT_MODEL = "mistralai/Mistral-7B-Instruct-v0.1"
 HF_API_ANALYSIS_MODEL = "mistralai/Mistral-7B-Instruct-v0.1"  # Using Mistral for analysis too
 
+# HuggingFace inference clients, created on first use
+inference_summary = None
+inference_ner = None
+inference_bot = None
+clients_initialized = False
+clients_lock = threading.Lock()
+
 # Initialize HuggingFace inference clients
 def initialize_inference_clients():
     """Initialize HuggingFace inference clients with robust error handling."""
@@ -47,16 +85,16 @@ def initialize_inference_clients():
         # Initialize the summary and NER models
         try:
             inference_summary = InferenceClient(model=HF_API_SUMMARY_MODEL, token=HF_API_KEY)
-            logger.info(f"Successfully initialized summary model: {HF_API_SUMMARY_MODEL}")
+            logger.info("Successfully initialized summary model: %s", HF_API_SUMMARY_MODEL)
         except Exception as sum_err:
-            logger.error(f"Error initializing summary model: {str(sum_err)}")
+            logger.error("Error initializing summary model: %s", sum_err)
             inference_summary = None
             
         try:
             inference_ner = InferenceClient(model=HF_API_NER_MODEL, token=HF_API_KEY)
-            logger.info(f"Successfully initialized NER model: {HF_API_NER_MODEL}")
+            logger.info("Successfully initialized NER model: %s", HF_API_NER_MODEL)
         except Exception as ner_err:
-            logger.error(f"Error initializing NER model: {str(ner_err)}")
+            logger.error("Error initializing NER model: %s", ner_err)
             inference_ner = None
         
         # Initialize Mistral with fallbacks
@@ -69,7 +107,7 @@ def initialize_inference_clients():
         
         for model in mistral_models:
             try:
-                logger.info(f"Attempting to initialize conversational model: {model}")
+                logger.info("Attempting to initialize conversational model: %s", model)
                 inference_bot = InferenceClient(model=model, token=HF_API_KEY)
                 
                 # Test the model with a simple prompt
@@ -84,13 +122,13 @@ def initialize_inference_clients():
                     # Generic format for other models
                     test_response = inference_bot.text_generation(prompt=test_prompt, max_new_tokens=10)
                 
-                logger.info(f"Successfully initialized and tested model: {model}")
+                logger.info("Successfully initialized and tested model: %s", model)
                 # Update the global variable to reflect the actual model used
                 global HF_API_BOT_MODEL
                 HF_API_BOT_MODEL = model
                 return True
             except Exception as model_err:
-                logger.warning(f"Failed to initialize model {model}: {str(model_err)}")
+                logger.warning("Failed to initialize model %s: %s", model, model_err)
                 continue
                 
         # If we get here, all models failed
@@ -99,24 +137,40 @@ def initialize_inference_clients():
         return False
         
     except Exception as e:
-        logger.error(f"Critical error initializing HuggingFace clients: {str(e)}")
+        logger.error("Critical error initializing HuggingFace clients: %s", e)
         inference_summary = None
         inference_ner = None
         inference_bot = None
         return False
 
+def ensure_inference_clients():
+    """Initialize the HuggingFace clients on first use instead of at import time."""
+    global clients_initialized
+    if clients_initialized:
+        return
+    
+    # Double-checked so concurrent first requests build the clients once and never see them half-initialized
+    with clients_lock:
+        if not clients_initialized:
+            if not initialize_inference_clients():
+                logger.warning("Failed to initialize some or all HuggingFace models. Some features may be limited.")
+            clients_initialized = True
+
 def rate_limited(max_per_second: float):
     """Decorator to limit the rate at which a function can be called."""
     min_interval = 1.0 / max_per_second
     def decorator(func):
         last_called = [0.0]
+        lock = threading.Lock()
         @wraps(func)
         def wrapper(*args, **kwargs):
-            elapsed = time.time() - last_called[0]
-            wait_time = min_interval - elapsed
-            if wait_time > 0:
-                time.sleep(wait_time)
-            last_called[0] = time.time()
+            # Serialize the wait so concurrent callers still respect the interval
+            with lock:
+                elapsed = time.time() - last_called[0]
+                wait_time = min_interval - elapsed
+                if wait_time > 0:
+                    time.sleep(wait_time)
+                last_called[0] = time.time()
             return func(*args, **kwargs)
         return wrapper
     return decorator
@@ -131,7 +185,7 @@ def retry_with_backoff(exceptions, tries=3, delay=2, backoff=2):
                 try:
                     return func(*args, **kwargs)
                 except exceptions as e:
-                    logger.warning(f"{func.__name__} failed due to {str(e)}, retrying in {_delay} seconds...")
+                    logger.warning("%s failed due to %s, retrying in %s seconds...", func.__name__, e, _delay)
                     time.sleep(_delay)
                     _tries -= 1
                     _delay *= backoff
@@ -139,6 +193,55 @@ def retry_with_backoff(exceptions, tries=3, delay=2, backoff=2):
         return wrapper
     return decorator
 
+def coalesce_in_flight(func):
+    """Share one call between concurrent callers that pass the same first argument."""
+    in_flight = {}
+    lock = threading.Lock()
+    
+    @wraps(func)
+    def wrapper(key, *args, **kwargs):
+        with lock:
+            future = in_flight.get(key)
+            is_owner = future is None
+            if is_owner:
+                future = Future()
+                in_flight[key] = future
+        
+        # Another request is already fetching this result, wait for it
+        if not is_owner:
+            return future.result()
+        
+        try:
+            result = func(key, *args, **kwargs)
+            future.set_result(result)
+            return result
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with lock:
+                in_flight.pop(key, None)
+    return wrapper
+
+def text_digest(text: str) -> str:
+    """Fixed-size cache key for arbitrarily long text."""
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+def serve_from_cache(text_cache: TTLCache, label: str):
+    """Decorator returning cached results for repeat texts before any rate limiting or API call."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(text, *args, **kwargs):
+            if text:
+                with cache_lock:
+                    cached = text_cache.get(text_digest(text))
+                if cached is not None:
+                    logger.debug("Cache hit for %s: %.50s...", label, text)
+                    return cached
+            return func(text, *args, **kwargs)
+        return wrapper
+    return decorator
+
 def generate_general_summary(individual_summaries: List[str]) -> str:
     """Generate a comprehensive summary from multiple individual summaries."""
     if not individual_summaries:
@@ -147,6 +250,7 @@ def generate_general_summary(individual_summaries: List[str]) -> str:
     combined_text = " ".join(individual_summaries)
     try:
         logger.info("Generating general summary via Hugging Face API")
+        ensure_inference_clients()
         if not inference_summary:
             return "Summary service unavailable at the moment."
         
@@ -170,23 +274,21 @@ def generate_general_summary(individual_summaries: List[str]) -> str:
         else:
             return str(response) if response else "No summary available"
     except Exception as e:
-        logger.error(f"Error generating general summary: {str(e)}")
+        logger.error("Error generating general summary: %s", e)
         return "Sorry, I couldn't generate a summary at the moment."
 
+@serve_from_cache(summary_cache, "summarization")
+@coalesce_in_flight
 @rate_limited(1.0)
 @retry_with_backoff(Exception, tries=3)
 def summarize_with_hf(text: str) -> str:
     """Summarize text using Hugging Face API with caching."""
     if not text:
         return "No content to summarize."
-        
-    # Check cache first
-    if text in summary_cache:
-        logger.info(f"Cache hit for summarization: {text[:50]}...")
-        return summary_cache[text]
     
     try:
-        logger.info(f"Summarizing text: {text[:50]}...")
+        logger.info("Summarizing text: %s...", text[:50])
+        ensure_inference_clients()
         max_input_length = 1024
         truncated_text = text[:max_input_length]
         
@@ -202,30 +304,29 @@ def summarize_with_hf(text: str) -> str:
         elif isinstance(response, dict):
             summary = response.get('summary_text', "No summary available")
         else:
-            logger.warning(f"Unexpected response format: {type(response)}")
+            logger.warning("Unexpected response format: %s", type(response))
             summary = str(response) if response else "No summary available"
             
         # Cache and return the summary
-        summary_cache[text] = summary
+        with cache_lock:
+            summary_cache[text_digest(text)] = summary
         return summary
     except Exception as e:
-        logger.error(f"Error in summarization: {str(e)}")
+        logger.error("Error in summarization: %s", e)
         return "Sorry, summarization is unavailable at the moment."
 
+@serve_from_cache(entity_cache, "NER")
+@coalesce_in_flight
 @rate_limited(1.0)
 @retry_with_backoff(Exception, tries=3)
 def extract_entities_with_hf(text: str) -> Dict[str, List[str]]:
     """Extract named entities from text using Hugging Face API with caching."""
     if not text:
         return {"entities": []}
-        
-    # Check cache first
-    if text in entity_cache:
-        logger.info(f"Cache hit for NER: {text[:50]}...")
-        return entity_cache[text]
     
     try:
-        logger.info(f"Extracting entities from text: {text[:50]}...")
+        logger.info("Extracting entities from text: %s...", text[:50])
+        ensure_inference_clients()
         max_input_length = 512
         truncated_text = text[:max_input_length]
         
@@ -236,17 +337,18 @@ def extract_entities_with_hf(text: str) -> Dict[str, List[str]]:
         
         # Ensure response is a list of dictionaries
         if not isinstance(response, list):
-            logger.warning(f"Unexpected NER response format: {type(response)}")
+            logger.warning("Unexpected NER response format: %s", type(response))
             entities = []
         else:
             # Filter entities by type
             entities = [ent['word'] for ent in response if 'entity_group' in ent and 'word' in ent and ent['entity_group'] in ['ORG', 'PER', 'LOC']]
         
         result = {"entities": entities}
-        entity_cache[text] = result
+        with cache_lock:
+            entity_cache[text_digest(text)] = result
         return result
     except Exception as e:
-        logger.error(f"Error extracting entities: {str(e)}")
+        logger.error("Error extracting entities: %s", e)
         return {"entities": []}
 
 @rate_limited(1.0)
@@ -257,7 +359,8 @@ def generate_conversational_response(user_input: str, conversation_history: List
         return "I didn't receive any input. How can I help you today?"
         
     try:
-        logger.info(f"Generating conversational response for input: {user_input[:50]}...")
+        logger.info("Generating conversational response for input: %s...", user_input[:50])
+        ensure_inference_clients()
         
         if not inference_bot:
             return "Conversational service unavailable at the moment."
@@ -310,7 +413,7 @@ def generate_conversational_response(user_input: str, conversation_history: List
                     content = str(response)
                     
             except Exception as chat_err:
-                logger.warning(f"Error using chat completion: {str(chat_err)}")
+                logger.warning("Error using chat completion: %s", chat_err)
                 # Fallback to simple text completion with cleaner prompt handling
                 prompt_parts = []
                 
@@ -378,7 +481,7 @@ def generate_conversational_response(user_input: str, conversation_history: List
             
         return content
     except Exception as e:
-        logger.error(f"Error generating conversational response: {str(e)}", exc_info=True)
+        logger.error("Error generating conversational response: %s", e, exc_info=True)
         return "I'm having trouble generating a response right now. Please try again later."
 
 @rate_limited(1.0)
@@ -391,7 +494,7 @@ def fetch_youtube_trends(query: str) -> List[Dict[str, Any]]:
         
     url = f"https://www.googleapis.com/youtube/v3/search?part=snippet&q={query}&type=video&maxResults=3&key={YOUTUBE_API_KEY}"
     try:
-        response = requests.get(url, timeout=10)
+        response = http_session.get(url, timeout=10)
         response.raise_for_status()  # Raise exception for 4XX/5XX responses
         result = response.json()
         items = result.get('items', [])
@@ -403,7 +506,7 @@ def fetch_youtube_trends(query: str) -> List[Dict[str, Any]]:
             "source": "YouTube"
         } for item in items]
     except Exception as e:
-        logger.error(f"Error fetching YouTube trends: {str(e)}")
+        logger.error("Error fetching YouTube trends: %s", e)
         return []
 
 @rate_limited(1.0)
@@ -416,7 +519,7 @@ def fetch_google_trends(query: str) -> List[Dict[str, Any]]:
         
     url = f"https://www.googleapis.com/customsearch/v1?q={query}&cx={GOOGLE_CSE_ID}&key={GOOGLE_API_KEY}"
     try:
-        response = requests.get(url, timeout=10)
+        response = http_session.get(url, timeout=10)
         response.raise_for_status()
         result = response.json()
         items = result.get('items', [])
@@ -428,7 +531,7 @@ def fetch_google_trends(query: str) -> List[Dict[str, Any]]:
             "source": "Google"
         } for item in items]
     except Exception as e:
-        logger.error(f"Error fetching Google trends: {str(e)}")
+        logger.error("Error fetching Google trends: %s", e)
         return []
 
 @rate_limited(1.0)
@@ -444,11 +547,14 @@ def fetch_reddit_trends(query: str) -> List[Dict[str, Any]]:
         return []
     
     try:
-        reddit = praw.Reddit(
-            client_id=reddit_client_id,
-            client_secret=reddit_secret,
-            user_agent=reddit_user_agent
-        )
+        reddit = getattr(reddit_clients, 'reddit', None)
+        if reddit is None:
+            reddit = praw.Reddit(
+                client_id=reddit_client_id,
+                client_secret=reddit_secret,
+                user_agent=reddit_user_agent
+            )
+            reddit_clients.reddit = reddit
         
         results = []
         for submission in reddit.subreddit("all").search(query, sort="top", limit=3):
@@ -462,7 +568,7 @@ def fetch_reddit_trends(query: str) -> List[Dict[str, Any]]:
             })
         return results
     except Exception as e:
-        logger.error(f"Error fetching Reddit trends: {str(e)}")
+        logger.error("Error fetching Reddit trends: %s", e)
         return []
 
 @rate_limited(1.0)
@@ -475,7 +581,7 @@ def fetch_news_articles(query: str) -> List[Dict[str, Any]]:
         
     url = f"https://newsapi.org/v2/everything?q={query}&apiKey={NEWSAPI_KEY}"
     try:
-        response = requests.get(url, timeout=10)
+        response = http_session.get(url, timeout=10)
         response.raise_for_status()
         result = response.json()
         articles = result.get('articles', [])[:3]  # Limit to 3 articles
@@ -487,33 +593,58 @@ def fetch_news_articles(query: str) -> List[Dict[str, Any]]:
             "source": "NewsAPI"
         } for article in articles]
     except Exception as e:
-        logger.error(f"Error fetching news articles: {str(e)}")
+        logger.error("Error fetching news articles: %s", e)
         return []
 
+# Trend sources queried for every search, fetched concurrently on a shared pool.
+# Fetchers and the summarize/NER calls they make run on pool threads alongside request threads,
+# so any module state they touch must be locked (cache_lock) or thread-local (reddit_clients).
+TREND_SOURCES = [fetch_youtube_trends, fetch_reddit_trends, fetch_google_trends, fetch_news_articles]
+source_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="trend-source")
+
+# Seconds to wait on the trend sources before answering with whatever has arrived
+SOURCE_TIMEOUT = float(os.getenv("KACHIFO_SOURCE_TIMEOUT", "15"))
+
 def fetch_trending_topics(query: str) -> List[Dict[str, Any]]:
     """
     Aggregate trending topics from multiple sources.
     Returns a combined list of trending topics.
     """
+    return gather_trending_topics(query)[0]
+
+def gather_trending_topics(query: str) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    Aggregate trending topics from multiple sources.
+    Returns (trends, complete), where complete is False if any source timed out.
+    """
     if not query:
-        return []
+        return [], True
         
-    logger.info(f"Fetching trending topics for query: {query}")
+    logger.info("Fetching trending topics for query: %s", query)
     
-    # Fetch trends from each source in parallel (future enhancement)
-    youtube_trends = fetch_youtube_trends(query)
-    reddit_trends = fetch_reddit_trends(query)
-    google_trends = fetch_google_trends(query)
-    news_trends = fetch_news_articles(query)
+    # Fetch trends from each source in parallel, so the wait is the slowest source rather than the sum
+    futures = [source_executor.submit(fetch, query) for fetch in TREND_SOURCES]
+    done, not_done = wait(futures, timeout=SOURCE_TIMEOUT)
+    if not_done:
+        logger.warning("%d trend source(s) timed out for query: %s", len(not_done), query)
     
-    # Combine results
+    # Combine results, keeping the source order stable
     all_trends = []
-    all_trends.extend(youtube_trends)
-    all_trends.extend(reddit_trends)
-    all_trends.extend(google_trends)
-    all_trends.extend(news_trends)
+    for future in futures:
+        if future in done:
+            all_trends.extend(future.result())
     
-    return all_trends
+    return all_trends, not not_done
+
+def iter_trending_topics(query):
+    """Yield (source index, trends) for each source as soon as it finishes, fastest first."""
+    logger.info("Streaming trending topics for query: %s", query)
+    futures = {source_executor.submit(fetch, query): index for index, fetch in enumerate(TREND_SOURCES)}
+    try:
+        for future in as_completed(futures, timeout=SOURCE_TIMEOUT):
+            yield futures[future], future.result()
+    except TimeoutError:
+        logger.warning("Trend sources timed out while streaming query: %s", query)
 
 @rate_limited(1.0)
 @retry_with_backoff(Exception, tries=2)
@@ -521,18 +652,20 @@ def perform_web_search(query: str) -> List[Dict[str, Any]]:
     """Perform a web search using Google Custom Search API."""
     # Check cache first
     cache_key = f"web:{query}"
-    if cache_key in web_search_cache:
-        logger.info(f"Cache hit for web search: {query}")
-        return web_search_cache[cache_key]
+    with cache_lock:
+        cached_results = web_search_cache.get(cache_key)
+    if cached_results is not None:
+        logger.info("Cache hit for web search: %s", query)
+        return cached_results
     
     results = []
     
     # Use Google Custom Search API
     if GOOGLE_API_KEY and GOOGLE_CSE_ID:
         try:
-            logger.info(f"Performing Google search for: {query}")
+            logger.info("Performing Google search for: %s", query)
             url = f"https://www.googleapis.com/customsearch/v1?q={query}&cx={GOOGLE_CSE_ID}&key={GOOGLE_API_KEY}&num=5"
-            response = requests.get(url, timeout=10)
+            response = http_session.get(url, timeout=10)
             response.raise_for_status()
             data = response.json()
             
@@ -544,20 +677,21 @@ def perform_web_search(query: str) -> List[Dict[str, Any]]:
                         "snippet": item.get("snippet", "")
                     })
         except Exception as e:
-            logger.error(f"Google search failed: {str(e)}")
+            logger.error("Google search failed: %s", e)
     else:
         logger.error("Google API key or CSE ID not configured for web search")
     
     # If no results, provide a fallback response
     if not results:
-        logger.warning(f"No search results found for: {query}")
+        logger.warning("No search results found for: %s", query)
         results = [{
             "title": "No search results found",
             "link": "#",
             "snippet": f"Unable to find web search results for '{query}'. Please try a different query or check your Google API configuration."
         }]
     
-    web_search_cache[cache_key] = results
+    with cache_lock:
+        web_search_cache[cache_key] = results
     return results
 
 @rate_limited(1.0)
@@ -569,12 +703,15 @@ def analyze_content(topic: str, content_list: List[str]) -> str:
     
     # Check cache
     cache_key = f"analysis:{topic}:{hash(str(content_list))}"
-    if cache_key in analysis_cache:
-        logger.info(f"Cache hit for analysis: {topic}")
-        return analysis_cache[cache_key]
+    with cache_lock:
+        cached_analysis = analysis_cache.get(cache_key)
+    if cached_analysis is not None:
+        logger.info("Cache hit for analysis: %s", topic)
+        return cached_analysis
     
     try:
-        logger.info(f"Analyzing content about: {topic}")
+        logger.info("Analyzing content about: %s", topic)
+        ensure_inference_clients()
         
         if not inference_bot:
             return f"Analysis service is unavailable at the moment. I can't provide an analysis for '{topic}'."
@@ -629,7 +766,7 @@ def analyze_content(topic: str, content_list: List[str]) -> str:
                     analysis = str(response)
                     
             except Exception as chat_err:
-                logger.warning(f"Chat completion failed for analysis: {str(chat_err)}")
+                logger.warning("Chat completion failed for analysis: %s", chat_err)
                 # Fall back to text generation
                 response = inference_bot.text_generation(
                     prompt=prompt,
@@ -678,16 +815,14 @@ def analyze_content(topic: str, content_list: List[str]) -> str:
                 analysis += f"- {url}\n"
         
         # Cache the result
-        analysis_cache[cache_key] = analysis
+        with cache_lock:
+            analysis_cache[cache_key] = analysis
         return analysis
         
     except Exception as e:
-        logger.error(f"Error analyzing content: {str(e)}", exc_info=True)
+        logger.error("Error analyzing content: %s", e, exc_info=True)
         return f"I encountered an issue while analyzing information about '{topic}'. Please try again later."
 
-# Call the initialization function after all functions are defined
-initialize_inference_clients()
-
 # For direct testing
 if __name__ == "__main__":
     user_query = input("What trends would you like to explore today? ")
@@ -1,73 +1,299 @@
 import os
+import atexit
 import logging
+import queue
 import re
+import reprlib
 import uuid
 import time
-import json
-from datetime import datetime
-from flask import Flask, request, jsonify, render_template, session
+import threading
+import orjson
+from datetime import datetime, date
+import redis
+from flask import Flask, request, jsonify, make_response, render_template, session, abort, Response, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 from flask_caching import Cache
+from flask_compress import Compress
 from flask_talisman import Talisman
-from functools import wraps
+from functools import wraps, lru_cache
+from logging.handlers import QueueHandler, QueueListener, WatchedFileHandler
+from cachetools import TTLCache
 from werkzeug.exceptions import HTTPException
 
 from api_integrations import (
-    fetch_trending_topics,
-    summarize_with_hf,
+    gather_trending_topics,
+    iter_trending_topics,
+    TREND_SOURCES,
     extract_entities_with_hf,
     generate_conversational_response,
     generate_general_summary,
-    initialize_inference_clients,
     perform_web_search,
-    analyze_content
+    analyze_content,
+    SUMMARY_FALLBACKS,
+    CONVERSATION_FALLBACKS
 )
+from models import UsageData
+
+class ORJSONProvider(DefaultJSONProvider):
+    """JSON provider backed by orjson, which is much faster than the stdlib encoder."""
+    def dumps(self, obj, **kwargs):
+        # sort_keys, indent and default are honored; ensure_ascii and separators are ignored,
+        # since orjson always writes compact UTF-8
+        option = orjson.OPT_NON_STR_KEYS
+        if kwargs.get('sort_keys', self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get('indent'):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=kwargs.get('default', self.default), option=option).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
 
 # Initialize Flask app
 app = Flask(__name__)
+app.json = ORJSONProvider(app)
 app.secret_key = os.getenv('SECRET_KEY', os.urandom(24).hex())
 
-# Enable HTTPS with secure headers
-Talisman(app, content_security_policy={
+# Reject oversized request bodies, and cap the user input that reaches the memoized input helpers
+app.config['MAX_CONTENT_LENGTH'] = 64 * 1024  # 64 KB
+MAX_INPUT_LENGTH = 2000  # characters
+INPUT_TOO_LONG_ERROR = f'Input must be at most {MAX_INPUT_LENGTH} characters'
+
+# Content Security Policy, joined into its header value once at import instead of on every response
+CSP_POLICY = {
     'default-src': ["'self'", 'https:'],
     'script-src': ["'self'", 'https:', "'unsafe-inline'"],  # Allow inline JS for animations
     'style-src': ["'self'", 'https:', "'unsafe-inline'"],   # Allow inline CSS
     'img-src': ["'self'", 'data:', 'https:'],
     'connect-src': ["'self'", 'https:'],
     'font-src': ["'self'", 'https:', 'data:']
-})
+}
+CSP_HEADER = '; '.join(f"{directive} {' '.join(sources)}" for directive, sources in CSP_POLICY.items())
+
+# Enable HTTPS with secure headers (CSP is set from the precomputed header below)
+Talisman(app, content_security_policy=None)
+
+@app.after_request
+def set_csp_header(response):
+    """Attach the precomputed Content Security Policy header."""
+    response.headers['Content-Security-Policy'] = CSP_HEADER
+    return response
+
+# Shared Redis connection for caching and rate limiting (falls back to in-process state when unset)
+REDIS_URL = os.environ.get('REDIS_URL')
+
+# Ping idle Redis connections before reuse and bound socket waits, so a dropped connection
+# is replaced transparently instead of failing the request that borrows it
+REDIS_OPTIONS = {
+    'health_check_interval': 30,
+    'socket_connect_timeout': 2,
+    'socket_timeout': 2,
+    'retry_on_timeout': True
+}
+
+# Cap on pooled Redis connections per worker
+REDIS_MAX_CONNECTIONS = int(os.environ.get('REDIS_MAX_CONNECTIONS', 50))
+
+redis_client = redis.Redis(connection_pool=redis.ConnectionPool.from_url(
+    REDIS_URL, max_connections=REDIS_MAX_CONNECTIONS, **REDIS_OPTIONS
+)) if REDIS_URL else None
 
-# Configure in-memory caching
-app.config['CACHE_TYPE'] = 'simple'
+# Configure caching, shared across workers through Redis when it is available
+if redis_client is not None:
+    app.config['CACHE_TYPE'] = 'RedisCache'
+    app.config['CACHE_REDIS_HOST'] = redis_client  # Reuse the limiter's pool instead of opening a second one
+else:
+    app.config['CACHE_TYPE'] = 'SimpleCache'
+    app.config['CACHE_THRESHOLD'] = 1000  # Bound the in-process cache
 app.config['CACHE_DEFAULT_TIMEOUT'] = 3600  # 1 hour
+app.config['CACHE_KEY_PREFIX'] = 'kachifo:'
 cache = Cache(app)
 
+# Gzip responses worth compressing; streamed NDJSON is left alone so each line is sent as it is produced
+app.config['COMPRESS_MIN_SIZE'] = 512
+app.config['COMPRESS_LEVEL'] = 6
+app.config['COMPRESS_STREAMS'] = False
+Compress(app)
+
+# Rate limit settings
+RATE_LIMIT_REQUESTS = 60
+RATE_LIMIT_WINDOW = 3600  # 1 hour
+rate_limit_lock = threading.Lock()
+
+# Process-local request counts per client IP, used when Redis is unset or unreachable.
+# Each entry expires RATE_LIMIT_WINDOW after the client's first request in the window.
+local_rate_counts = TTLCache(maxsize=10000, ttl=RATE_LIMIT_WINDOW)
+
+# Token-bucket rate limiter executed atomically inside Redis.
+# The bucket holds up to `capacity` tokens and refills evenly over the window; each request takes one.
+# Returns the number of whole tokens left, or -1 once the bucket is empty.
+RATE_LIMIT_LUA = """
+local key = KEYS[1]
+local now = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local window = tonumber(ARGV[3])
+local bucket = redis.call('HMGET', key, 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * capacity / window)
+local allowed = tokens >= 1
+if allowed then
+    tokens = tokens - 1
+end
+redis.call('HSET', key, 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', key, window)
+if not allowed then
+    return -1
+end
+return math.floor(tokens)
+"""
+
+# Loaded into Redis once and invoked by SHA afterwards, so the script body isn't resent per request
+rate_limit_script = redis_client.register_script(RATE_LIMIT_LUA) if redis_client is not None else None
+
 # Initialize usage statistics
-daily_usage_count = 0
+daily_usage = UsageData()
+usage_lock = threading.Lock()
 
-# Conversation history storage
-conversation_store = {}
+# Conversation history storage, bounded and expired after 24 hours without activity
+CONVERSATION_MAX_SESSIONS = 10000
+CONVERSATION_TTL = 86400  # 24 hours
+conversation_store = TTLCache(maxsize=CONVERSATION_MAX_SESSIONS, ttl=CONVERSATION_TTL)
+conversation_lock = threading.Lock()
+
+# Hit/miss counters for cached opening replies, kept in a Redis hash shared by all workers
+# when available and in process-local counters otherwise
+CONVERSATION_CACHE_STATS_KEY = 'stats:conversation_cache'
+conversation_cache_stats = {'hits': 0, 'misses': 0}
+conversation_cache_stats_lock = threading.Lock()
+
+# Input patterns, compiled once at import instead of on every request
+SANITIZE_PATTERN = re.compile(r"[^\w\s]")
+
+# Same filter as SANITIZE_PATTERN for ASCII input, applied by str.translate without the regex engine
+SANITIZE_ASCII_TABLE = {
+    code: None for code in range(128)
+    if not (chr(code).isalnum() or chr(code).isspace() or chr(code) == '_')
+}
+
+# Common follow-up patterns, combined so the input is scanned once
+FOLLOWUP_KEYWORDS = [
+    r'more|tell me more|continue|elaborate|explain further|can you explain|what about',
+    r'why|how|what|when|where|who',
+    r'thanks|thank you|got it',
+    r'and|also|additionally|moreover|furthermore|besides',
+    r'details|specifics|examples|instances|cases',
+    r'compared to|versus|vs|difference between',
+    r'show me|display|list|share|tell me again|provide',
+    r'anything else|further|more information|elaborate on',
+    r'specifically|in particular|especially|notably|mainly',
+    r'deeper|further|additional|extra|supplementary'
+]
+FOLLOWUP_PATTERN = re.compile(r'\b(' + '|'.join(FOLLOWUP_KEYWORDS) + r')\b', re.IGNORECASE)
+
+# Patterns suggesting a search query intention
+QUERY_PATTERN = re.compile(
+    r'\b(search|find|look up|what is|tell me about|trending|give me|show me|discover|explore|list|popular|top|best|latest in|tell me more about|what\'s new in|whats happening|hot|trend|recommendation|suggest)\b', 
+    re.IGNORECASE
+)
+
+# Patterns suggesting an analysis request
+ANALYSIS_PATTERN = re.compile(
+    r'\b(analyze|analysis|evaluate|review|compare|summarize|insights|opinion|thoughts on|perspective|breakdown|assessment|critique|examine|study|interpret|explain why|understand|investigate|deep dive|details about|implications|impact of|meaning of|significance|important|relevance|context|synthesize|conclude|deduce)\b',
+    re.IGNORECASE
+)
+
+# Web search pattern
+WEB_SEARCH_PATTERN = re.compile(
+    r'\b(web search|google|search online|current|latest|today|live|news|recent|internet|web|online|right now|up to date|real time|breaking news|just released|just published|fresh info|as of now|currently|presently|at this moment|development|update|what does the internet say|what\'s online|browser|search engine|find online|lookup online)\b',
+    re.IGNORECASE
+)
+
+# Explicit commands pattern
+COMMAND_PATTERN = re.compile(
+    r'\b(search for|analyze the|search the web for|give me analysis of|tell me the latest on|find information about|lookup information on|get me details on|show data for|research about|investigate)\b',
+    re.IGNORECASE
+)
+WEB_COMMAND_PATTERN = re.compile(r'\b(search the web|search online|google)\b', re.IGNORECASE)
+ANALYSIS_COMMAND_PATTERN = re.compile(r'\b(analyze|analysis)\b', re.IGNORECASE)
+
+# Topic-specific keywords that could indicate domain-specific searches
+TOPIC_KEYWORDS = {
+    'tech': r'technology|tech|AI|artificial intelligence|programming|software|hardware|digital|computer|app|application|coding|developer|IT|information technology|data|algorithm|cybersecurity|internet of things|IoT|machine learning|ML|cloud|mobile|DevOps|blockchain|VR|AR|virtual reality|augmented reality',
+    'business': r'business|finance|company|market|stock|investment|economy|industry|startup|entrepreneur|corporate|CEO|strategy|management|leadership|profit|revenue|ROI|sales|marketing|commerce|trade|SME|enterprise|B2B|B2C|retail|wholesale|supply chain|logistics|e-commerce',
+    'health': r'health|medical|wellness|nutrition|fitness|diet|exercise|doctor|hospital|treatment|therapy|mental health|wellbeing|healthcare|medicine|disease|illness|condition|symptom|diagnosis|prescription|pharmaceutical|drug|vitamin|supplement|immunity|chronic|acute|pandemic|epidemic|virus|bacteria|psychology|psychiatry',
+    'entertainment': r'movie|film|tv|television|show|series|music|song|artist|celebrity|entertainment|streaming|netflix|amazon prime|disney\+|hulu|hbo|spotify|youtube|actor|actress|director|producer|genre|award|oscar|emmy|grammy|box office|concert|theater|performance|video game|gaming|esports',
+    'travel': r'travel|tourism|vacation|holiday|destination|trip|journey|tour|flight|hotel|resort|accommodation|booking|airbnb|sightseeing|attraction|landmark|tourist|visa|passport|international|domestic|adventure|cruise|beach|mountain|city break|backpacking|luxury travel',
+    'education': r'education|school|university|college|degree|course|study|learn|student|teacher|professor|academic|research|thesis|dissertation|exam|test|grade|curriculum|lecture|class|subject|online learning|e-learning|scholarship|admission|graduation'
+}
+TOPIC_PATTERN = re.compile(r'\b(' + '|'.join(TOPIC_KEYWORDS.values()) + r')\b', re.IGNORECASE)
+
+# Question pattern - indicates information seeking behavior
+QUESTION_PATTERN = re.compile(r'\b(who|what|where|when|why|how|is there|are there|can you|could you|would you|will you|should i|could i|can i)\b.*\?', re.IGNORECASE)
+SELF_REFERENCE_PATTERN = re.compile(r'\b(you|your|yourself)\b', re.IGNORECASE)
+
+# Sentences that are clearly conversational
+CONVERSATIONAL_PATTERN = re.compile(
+    r'\b(hello|hi|hey|greetings|good morning|good afternoon|good evening|thanks|thank you|appreciate|how are you|nice to meet|pleased to|goodbye|bye|see you|talk to you|chat|converse|help me|assist me|your name|about you|tell me about yourself)\b',
+    re.IGNORECASE
+)
+
+# Background listener that writes queued log records to the real handlers
+log_listener = None
+
+# Formatter for consistent log format, built once and shared by every handler
+LOG_FORMATTER = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+# Truncates request payloads written to debug logs
+payload_repr = reprlib.Repr()
+payload_repr.maxstring = 200
+payload_repr.maxother = 200
 
 def setup_logging():
     """Configure application logging."""
+    global log_listener
     log_level = os.environ.get('LOG_LEVEL', 'INFO').upper()
     log_file = os.environ.get('LOG_FILE', 'kachifo.log')
     
-    # Create formatter for consistent log format
-    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-    
-    # Setup file handler
-    file_handler = logging.FileHandler(log_file)
-    file_handler.setFormatter(formatter)
+    # Setup file handler; gunicorn workers share the file, so rotation is left to an external
+    # tool such as logrotate and the handler reopens the file once it has been moved
+    file_handler = WatchedFileHandler(log_file)
+    file_handler.setFormatter(LOG_FORMATTER)
     
     # Setup console handler
     console_handler = logging.StreamHandler()
-    console_handler.setFormatter(formatter)
+    console_handler.setFormatter(LOG_FORMATTER)
+    
+    # Write records from a background thread so request threads only enqueue them
+    log_queue = queue.Queue(-1)
+    log_listener = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+    log_listener.start()
+    
+    # Drain queued records to the handlers before the process exits
+    atexit.register(log_listener.stop)
     
     # Configure root logger
     root_logger = logging.getLogger()
     root_logger.setLevel(log_level)
-    root_logger.addHandler(file_handler)
-    root_logger.addHandler(console_handler)
+    root_logger.addHandler(QueueHandler(log_queue))
+
+def restart_log_listener():
+    """Give a forked worker its own log queue and listener thread."""
+    global log_listener
+    # The parent's queue lock may have been held at fork time, so the child must not touch that queue again
+    atexit.unregister(log_listener.stop)
+    log_queue = queue.Queue(-1)
+    
+    # Point the root logger at the new queue
+    root_logger = logging.getLogger()
+    for handler in list(root_logger.handlers):
+        if isinstance(handler, QueueHandler):
+            root_logger.removeHandler(handler)
+    root_logger.addHandler(QueueHandler(log_queue))
+    
+    log_listener = QueueListener(log_queue, *log_listener.handlers, respect_handler_level=True)
+    log_listener.start()
+    atexit.register(log_listener.stop)
 
 setup_logging()
 logger = logging.getLogger(__name__)
@@ -79,50 +305,213 @@ def create_response(data, status_code=200, message="Success"):
 @app.before_request
 def log_request_info():
     """Log information about incoming requests."""
-    logger.info(f'Request: {request.method} {request.url}')
+    # Per-request traces are debug-only, so skip building the URL when DEBUG is off
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    logger.debug('Request: %s %s', request.method, request.url)
     
     # Only log detailed info for non-production environments
     if os.environ.get('FLASK_ENV') != 'production':
-        logger.debug(f'Headers: {request.headers}')
+        logger.debug('Headers: %s', request.headers)
         if request.method in ['POST', 'PUT'] and request.is_json:
-            logger.debug(f'Body: {request.get_json()}')
+            logger.debug('Body: %s', payload_repr.repr(request.get_json(silent=True)))
 
 @app.after_request
 def log_response_info(response):
     """Log information about outgoing responses."""
-    logger.info(f'Response: {response.status}')
+    logger.debug('Response: %s', response.status)
     return response
 
+def redis_rate_limit(client_ip):
+    """Take a token from the client's Redis bucket and return the remaining quota."""
+    now_ms = int(time.time() * 1000)
+    return rate_limit_script(
+        keys=[f"rl:{client_ip}"],
+        args=[now_ms, RATE_LIMIT_REQUESTS, RATE_LIMIT_WINDOW * 1000],
+        client=redis_client
+    )
+
+def local_rate_limit(client_ip):
+    """Count a request in process-local state when Redis is unavailable and return the remaining quota."""
+    with rate_limit_lock:
+        # Open a new window if none exists; mutating the entry in place keeps its original expiry
+        counter = local_rate_counts.get(client_ip)
+        if counter is None:
+            counter = local_rate_counts[client_ip] = [0]
+        counter[0] += 1
+        request_count = counter[0]
+    
+    return RATE_LIMIT_REQUESTS - request_count
+
 def rate_limit(func):
     """Rate limiting decorator for API endpoints."""
     @wraps(func)
     def wrapper(*args, **kwargs):
         # Get client IP for more granular rate limiting
         client_ip = request.remote_addr
-        key = f"rate_limit:{client_ip}"
-        
-        # Check remaining requests
-        remaining_requests = cache.get(key)
-        if remaining_requests is None:
-            # Initialize with 60 requests per hour
-            remaining_requests = 60
-            cache.set(key, remaining_requests, timeout=3600)  # 1 hour
-        elif remaining_requests <= 0:
-            logger.warning(f"Rate limit exceeded for {client_ip}")
-            return jsonify({'error': 'Rate limit exceeded. Please try again later.'}), 429
-        
-        # Decrement remaining requests
-        cache.set(key, remaining_requests - 1, timeout=3600)
-        return func(*args, **kwargs)
+        
+        if redis_client is not None:
+            try:
+                remaining_requests = redis_rate_limit(client_ip)
+            except redis.RedisError as e:
+                logger.error("Redis rate limiter unavailable, using local limits: %s", e)
+                remaining_requests = local_rate_limit(client_ip)
+        else:
+            remaining_requests = local_rate_limit(client_ip)
+        
+        if remaining_requests < 0:
+            logger.warning("Rate limit exceeded for %s", client_ip)
+            response = make_response(jsonify({'error': 'Rate limit exceeded. Please try again later.'}), 429)
+            response.headers['X-RateLimit-Remaining'] = '0'
+            return response
+        
+        # Let clients see their remaining quota without an extra request
+        response = make_response(func(*args, **kwargs))
+        response.headers['X-RateLimit-Remaining'] = str(remaining_requests)
+        return response
     return wrapper
 
+def increment_daily_usage():
+    """Count a request against today's usage and return the new total."""
+    global daily_usage
+    
+    if redis_client is not None:
+        key = f"usage:{date.today().isoformat()}"
+        try:
+            # INCR is atomic, so concurrent workers never lose an update; both commands share one round-trip
+            pipe = redis_client.pipeline()
+            pipe.incr(key)
+            pipe.expire(key, 86400 * 2)  # Keep yesterday's count around for /stats
+            count, _ = pipe.execute()
+            return count
+        except redis.RedisError as e:
+            logger.error("Redis usage counter unavailable, counting locally: %s", e)
+    
+    with usage_lock:
+        if daily_usage.date != date.today():
+            daily_usage = UsageData()
+        daily_usage.increment()
+        return daily_usage.count
+
+def get_daily_usage():
+    """Return the number of requests counted today."""
+    if redis_client is not None:
+        try:
+            return int(redis_client.get(f"usage:{date.today().isoformat()}") or 0)
+        except redis.RedisError as e:
+            logger.error("Redis usage counter unavailable, reading local count: %s", e)
+    
+    with usage_lock:
+        return daily_usage.count if daily_usage.date == date.today() else 0
+
+def record_conversation_cache(outcome):
+    """Count a conversation cache 'hits' or 'misses' outcome."""
+    if redis_client is not None:
+        try:
+            redis_client.hincrby(CONVERSATION_CACHE_STATS_KEY, outcome, 1)
+            return
+        except redis.RedisError as e:
+            logger.error("Redis stats counter unavailable, counting locally: %s", e)
+    
+    with conversation_cache_stats_lock:
+        conversation_cache_stats[outcome] += 1
+
+def get_conversation_cache_stats():
+    """Return conversation cache hits and misses, with the scope they were counted over."""
+    if redis_client is not None:
+        try:
+            stats = redis_client.hgetall(CONVERSATION_CACHE_STATS_KEY)
+            return {
+                'hits': int(stats.get(b'hits', 0)),
+                'misses': int(stats.get(b'misses', 0)),
+                'scope': 'all workers'
+            }
+        except redis.RedisError as e:
+            logger.error("Redis stats counter unavailable, reading local counts: %s", e)
+    
+    with conversation_cache_stats_lock:
+        return {**conversation_cache_stats, 'scope': 'this worker'}
+
+def cache_get(key):
+    """Read from the application cache, treating an unreachable Redis as a miss."""
+    try:
+        return cache.get(key)
+    except redis.RedisError as e:
+        logger.error("Cache unavailable, treating %s as a miss: %s", key, e)
+        return None
+
+def cache_set(key, value, timeout):
+    """Write to the application cache, skipping the write if Redis is unreachable."""
+    try:
+        cache.set(key, value, timeout=timeout)
+    except redis.RedisError as e:
+        logger.error("Cache unavailable, not storing %s: %s", key, e)
+
+def is_real_summary(summary):
+    """Only cache summaries that came back from the model, not fallback messages."""
+    return summary not in SUMMARY_FALLBACKS
+
+def normalize_query(query):
+    """Lowercase and collapse whitespace so equivalent queries share cache entries."""
+    return " ".join(query.lower().split())
+
+def is_complete_fetch(result):
+    """Only cache trend fetches where every source answered and something was found."""
+    trends, complete = result
+    return complete and bool(trends)
+
+@cache.memoize(timeout=900, response_filter=is_complete_fetch)
+def memoized_trending_topics(query):
+    """Fetch trending topics, sharing results through the application cache."""
+    return gather_trending_topics(query)
+
+def cached_trending_topics(query):
+    """Fetch trending topics through the cache, keyed by the normalized query, as (trends, complete)."""
+    return memoized_trending_topics(normalize_query(query))
+
+def trending_topics_cache_key(normalized_query):
+    """Cache key memoized_trending_topics uses for a normalized query, or None if the cache is unreachable."""
+    try:
+        return memoized_trending_topics.make_cache_key(memoized_trending_topics.uncached, normalized_query)
+    except redis.RedisError as e:
+        logger.error("Cache unavailable, not keying trends for %s: %s", normalized_query, e)
+        return None
+
+@cache.memoize(timeout=86400, response_filter=is_real_summary)
+def cached_general_summary(individual_summaries):
+    """Generate an overall summary, sharing results through the application cache."""
+    return generate_general_summary(individual_summaries)
+
+def get_conversational_response(user_input, conversation_history):
+    """Generate a conversational reply, serving repeated opening messages from the cache."""
+    # Only the first turn is context-free; later replies depend on the whole history
+    normalized_input = normalize_query(sanitize_input(user_input))
+    if len(conversation_history) > 2 or not normalized_input:
+        return generate_conversational_response(user_input, conversation_history)
+    
+    cache_key = f"conversation:{normalized_input}"
+    response_text = cache_get(cache_key)
+    if response_text is not None:
+        record_conversation_cache('hits')
+        return response_text
+    
+    record_conversation_cache('misses')
+    response_text = generate_conversational_response(user_input, conversation_history)
+    if response_text not in CONVERSATION_FALLBACKS:
+        cache_set(cache_key, response_text, timeout=7 * 86400)  # Cache for a week
+    return response_text
+
+@lru_cache(maxsize=4096)
 def sanitize_input(query):
     """Sanitize user input to prevent injection attacks."""
     if not query:
         return ""
     # Remove special characters, keep alphanumeric and spaces
-    sanitized = re.sub(r"[^\w\s]", "", query).strip()
-    logger.info(f"Sanitized input: {sanitized}")
+    if query.isascii():
+        sanitized = query.translate(SANITIZE_ASCII_TABLE).strip()
+    else:
+        sanitized = SANITIZE_PATTERN.sub("", query).strip()
+    logger.debug("Sanitized input: %s", sanitized)
     return sanitized
 
 def classify_input_type(user_input, conversation_history=None):
@@ -135,28 +524,13 @@ def classify_input_type(user_input, conversation_history=None):
         prev_query = conversation_history[-2].get('content', '')
         prev_response = conversation_history[-1].get('content', '')
         
-        # Common follow-up patterns
-        followup_patterns = [
-            r'\b(more|tell me more|continue|elaborate|explain further|can you explain|what about)\b',
-            r'\b(why|how|what|when|where|who)\b',
-            r'\b(thanks|thank you|got it)\b',
-            r'\b(and|also|additionally|moreover|furthermore|besides)\b',
-            r'\b(details|specifics|examples|instances|cases)\b',
-            r'\b(compared to|versus|vs|difference between)\b',
-            r'\b(show me|display|list|share|tell me again|provide)\b',
-            r'\b(anything else|further|more information|elaborate on)\b',
-            r'\b(specifically|in particular|especially|notably|mainly)\b',
-            r'\b(deeper|further|additional|extra|supplementary)\b'
-        ]
-        
-        for pattern in followup_patterns:
-            if re.search(pattern, user_input, re.IGNORECASE):
-                if 'query' in prev_query.lower() or 'search' in prev_query.lower() or 'find' in prev_query.lower():
-                    return 'query'
-                elif 'analyze' in prev_query.lower() or 'analysis' in prev_query.lower() or 'insight' in prev_query.lower() or 'perspective' in prev_query.lower():
-                    return 'analysis'
-                elif 'web' in prev_query.lower() or 'internet' in prev_query.lower() or 'online' in prev_query.lower() or 'google' in prev_query.lower() or 'latest' in prev_query.lower():
-                    return 'web_search'
+        if FOLLOWUP_PATTERN.search(user_input):
+            if 'query' in prev_query.lower() or 'search' in prev_query.lower() or 'find' in prev_query.lower():
+                return 'query'
+            elif 'analyze' in prev_query.lower() or 'analysis' in prev_query.lower() or 'insight' in prev_query.lower() or 'perspective' in prev_query.lower():
+                return 'analysis'
+            elif 'web' in prev_query.lower() or 'internet' in prev_query.lower() or 'online' in prev_query.lower() or 'google' in prev_query.lower() or 'latest' in prev_query.lower():
+                return 'web_search'
                 
         # Check for reference to previous topics in conversation history
         for message in conversation_history[-3:]:  # Check last 3 messages
@@ -167,83 +541,48 @@ def classify_input_type(user_input, conversation_history=None):
                         return 'analysis'
                     elif any(term in message.get('content', '').lower() for term in ['search results', 'found', 'trending']):
                         return 'query'
-        
-    # Patterns suggesting a search query intention
-    query_pattern = re.compile(
-        r'\b(search|find|look up|what is|tell me about|trending|give me|show me|discover|explore|list|popular|top|best|latest in|tell me more about|what\'s new in|whats happening|hot|trend|recommendation|suggest)\b', 
-        re.IGNORECASE
-    )
-    
-    # Patterns suggesting an analysis request
-    analysis_pattern = re.compile(
-        r'\b(analyze|analysis|evaluate|review|compare|summarize|insights|opinion|thoughts on|perspective|breakdown|assessment|critique|examine|study|interpret|explain why|understand|investigate|deep dive|details about|implications|impact of|meaning of|significance|important|relevance|context|synthesize|conclude|deduce)\b',
-        re.IGNORECASE
-    )
-    
-    # Web search pattern
-    web_search_pattern = re.compile(
-        r'\b(web search|google|search online|current|latest|today|live|news|recent|internet|web|online|right now|up to date|real time|breaking news|just released|just published|fresh info|as of now|currently|presently|at this moment|development|update|what does the internet say|what\'s online|browser|search engine|find online|lookup online)\b',
-        re.IGNORECASE
-    )
-    
-    # Explicit commands pattern
-    command_pattern = re.compile(
-        r'\b(search for|analyze the|search the web for|give me analysis of|tell me the latest on|find information about|lookup information on|get me details on|show data for|research about|investigate)\b',
-        re.IGNORECASE
-    )
     
+    return classify_standalone_input(user_input)
+
+@lru_cache(maxsize=4096)
+def classify_standalone_input(user_input):
+    """Classify an input on its own text, without conversation context."""
     # Check for explicit commands first
-    if command_pattern.search(user_input):
-        if re.search(r'\b(search the web|search online|google)\b', user_input, re.IGNORECASE):
+    if COMMAND_PATTERN.search(user_input):
+        if WEB_COMMAND_PATTERN.search(user_input):
             return 'web_search'
-        elif re.search(r'\b(analyze|analysis)\b', user_input, re.IGNORECASE):
+        elif ANALYSIS_COMMAND_PATTERN.search(user_input):
             return 'analysis'
         else:
             return 'query'
     
-    # Topic-specific patterns that could indicate domain-specific searches
-    topic_patterns = {
-        'tech': re.compile(r'\b(technology|tech|AI|artificial intelligence|programming|software|hardware|digital|computer|app|application|coding|developer|IT|information technology|data|algorithm|cybersecurity|internet of things|IoT|machine learning|ML|cloud|mobile|DevOps|blockchain|VR|AR|virtual reality|augmented reality)\b', re.IGNORECASE),
-        'business': re.compile(r'\b(business|finance|company|market|stock|investment|economy|industry|startup|entrepreneur|corporate|CEO|strategy|management|leadership|profit|revenue|ROI|sales|marketing|commerce|trade|SME|enterprise|B2B|B2C|retail|wholesale|supply chain|logistics|e-commerce)\b', re.IGNORECASE),
-        'health': re.compile(r'\b(health|medical|wellness|nutrition|fitness|diet|exercise|doctor|hospital|treatment|therapy|mental health|wellbeing|healthcare|medicine|disease|illness|condition|symptom|diagnosis|prescription|pharmaceutical|drug|vitamin|supplement|immunity|chronic|acute|pandemic|epidemic|virus|bacteria|psychology|psychiatry)\b', re.IGNORECASE),
-        'entertainment': re.compile(r'\b(movie|film|tv|television|show|series|music|song|artist|celebrity|entertainment|streaming|netflix|amazon prime|disney\+|hulu|hbo|spotify|youtube|actor|actress|director|producer|genre|award|oscar|emmy|grammy|box office|concert|theater|performance|video game|gaming|esports)\b', re.IGNORECASE),
-        'travel': re.compile(r'\b(travel|tourism|vacation|holiday|destination|trip|journey|tour|flight|hotel|resort|accommodation|booking|airbnb|sightseeing|attraction|landmark|tourist|visa|passport|international|domestic|adventure|cruise|beach|mountain|city break|backpacking|luxury travel)\b', re.IGNORECASE),
-        'education': re.compile(r'\b(education|school|university|college|degree|course|study|learn|student|teacher|professor|academic|research|thesis|dissertation|exam|test|grade|curriculum|lecture|class|subject|online learning|e-learning|scholarship|admission|graduation)\b', re.IGNORECASE)
-    }
-    
     # Check for topic-specific patterns first
-    for topic, pattern in topic_patterns.items():
-        if pattern.search(user_input):
-            # More likely to be a query if a specific topic is mentioned
-            return 'query'
+    if TOPIC_PATTERN.search(user_input):
+        # More likely to be a query if a specific topic is mentioned
+        return 'query'
     
     # Question pattern - indicates information seeking behavior
-    question_pattern = re.compile(r'\b(who|what|where|when|why|how|is there|are there|can you|could you|would you|will you|should i|could i|can i)\b.*\?', re.IGNORECASE)
-    if question_pattern.search(user_input):
+    if QUESTION_PATTERN.search(user_input):
         # Check if it's a web search question
-        if web_search_pattern.search(user_input):
+        if WEB_SEARCH_PATTERN.search(user_input):
             return 'web_search'
         # Check if it's an analysis question
-        elif analysis_pattern.search(user_input):
+        elif ANALYSIS_PATTERN.search(user_input):
             return 'analysis'
         # Default to query for most questions
-        elif not re.search(r'\b(you|your|yourself)\b', user_input, re.IGNORECASE):  # Not asking about the assistant
+        elif not SELF_REFERENCE_PATTERN.search(user_input):  # Not asking about the assistant
             return 'query'
     
     # Then check for general search patterns
-    if web_search_pattern.search(user_input):
+    if WEB_SEARCH_PATTERN.search(user_input):
         return 'web_search'
-    elif analysis_pattern.search(user_input):
+    elif ANALYSIS_PATTERN.search(user_input):
         return 'analysis'
-    elif query_pattern.search(user_input):
+    elif QUERY_PATTERN.search(user_input):
         return 'query'
     
     # Check for sentences that are clearly conversational
-    conversational_pattern = re.compile(
-        r'\b(hello|hi|hey|greetings|good morning|good afternoon|good evening|thanks|thank you|appreciate|how are you|nice to meet|pleased to|goodbye|bye|see you|talk to you|chat|converse|help me|assist me|your name|about you|tell me about yourself)\b',
-        re.IGNORECASE
-    )
-    if conversational_pattern.search(user_input):
+    if CONVERSATIONAL_PATTERN.search(user_input):
         return 'conversation'
     
     # If no patterns match, it's likely a conversation
@@ -251,29 +590,25 @@ def classify_input_type(user_input, conversation_history=None):
 
 def get_conversation_history(session_id):
     """Retrieve conversation history for a session."""
-    # Clean up old conversations (older than 24 hours)
     current_time = time.time()
-    expired_keys = []
-    
-    for key, data in conversation_store.items():
-        if current_time - data.get('last_updated', 0) > 86400:  # 24 hours
-            expired_keys.append(key)
-    
-    for key in expired_keys:
-        conversation_store.pop(key, None)
-    
-    # Get or create conversation history
-    if session_id not in conversation_store:
-        conversation_store[session_id] = {
-            'history': [
-                {'role': 'system', 'content': 'You are Kachifo, a helpful AI assistant specialized in discovering and analyzing trends. "Kachifo" is an Igbo word meaning "Good night" or "Let day break" and is used as a friendly greeting or expression of praise in Nigerian culture. Never prefix your responses with "Kachifo:" or "As Kachifo," just respond naturally as if you are the assistant named Kachifo.'}
-            ],
-            'last_updated': current_time
-        }
-    else:
-        conversation_store[session_id]['last_updated'] = current_time
+    
+    # Get or create conversation history; expired sessions are dropped by the TTL cache itself
+    with conversation_lock:
+        conversation = conversation_store.get(session_id)
+        if conversation is None:
+            conversation = {
+                'history': [
+                    {'role': 'system', 'content': 'You are Kachifo, a helpful AI assistant specialized in discovering and analyzing trends. "Kachifo" is an Igbo word meaning "Good night" or "Let day break" and is used as a friendly greeting or expression of praise in Nigerian culture. Never prefix your responses with "Kachifo:" or "As Kachifo," just respond naturally as if you are the assistant named Kachifo.'}
+                ],
+                'last_updated': current_time
+            }
+        else:
+            conversation['last_updated'] = current_time
+        
+        # Re-inserting restarts the session's TTL
+        conversation_store[session_id] = conversation
         
-    return conversation_store[session_id]['history']
+    return conversation['history']
 
 def update_conversation_history(session_id, role, content):
     """Add a message to the conversation history."""
@@ -284,7 +619,10 @@ def update_conversation_history(session_id, role, content):
     if len(history) > 11:  # 1 system + 10 messages
         history.pop(1)  # Remove the oldest message (but keep the system message)
     
-    conversation_store[session_id]['last_updated'] = time.time()
+    with conversation_lock:
+        conversation = conversation_store.get(session_id)
+        if conversation is not None:
+            conversation['last_updated'] = time.time()
     return history
 
 @app.route('/')
@@ -302,16 +640,17 @@ def home():
 @rate_limit
 def interact():
     """Main interaction endpoint for handling queries, analysis, and conversations."""
-    global daily_usage_count
-    daily_usage_count += 1
+    increment_daily_usage()
     
-    data = request.get_json()
+    data = request.get_json(silent=True)
     if not data:
         return jsonify({'error': 'No data provided'}), 400
         
     user_input = data.get('input', '').strip()
     if not user_input:
         return jsonify({'error': 'No input provided'}), 400
+    if len(user_input) > MAX_INPUT_LENGTH:
+        return jsonify({'error': INPUT_TOO_LONG_ERROR}), 400
 
     # Get or create session ID
     client_session_id = data.get('session_id')
@@ -339,23 +678,26 @@ def interact():
     try:
         if input_type == 'web_search':
             # Handle web search request
-            logger.info(f"Processing web search: {user_input}")
+            logger.info("Processing web search: %.200s", user_input)
             response = process_web_search(user_input, session_id)
             
         elif input_type == 'analysis':
             # Handle analysis request
-            logger.info(f"Processing analysis: {user_input}")
+            logger.info("Processing analysis: %.200s", user_input)
             response = process_analysis(user_input, session_id)
             
         elif input_type == 'query':
-            # Handle search query
-            logger.info(f"Processing search query: {user_input}")
-            response = process_search_query(user_input, session_id)
+            # Handle search query, streaming results as they are summarized if the client asked for it
+            logger.info("Processing search query: %.200s", user_input)
+            if data.get('stream') or request.accept_mimetypes.best == 'application/x-ndjson':
+                response = stream_search_query(user_input, session_id)
+            else:
+                response = process_search_query(user_input, session_id)
             
         else:
             # Handle conversational input
-            logger.info(f"Processing conversation: {user_input}")
-            response_text = generate_conversational_response(user_input, conversation_history)
+            logger.info("Processing conversation: %.200s", user_input)
+            response_text = get_conversational_response(user_input, conversation_history)
             
             # Add assistant response to history
             update_conversation_history(session_id, 'assistant', response_text)
@@ -369,7 +711,7 @@ def interact():
         return response
         
     except Exception as e:
-        logger.error(f"Error in /interact: {str(e)}", exc_info=True)
+        logger.error("Error in /interact: %s", e, exc_info=True)
         
         # Handle different types of errors gracefully
         error_message = "I'm sorry, I encountered an issue processing your request."
@@ -389,14 +731,22 @@ def interact():
             'type': 'error'
         }), 500
 
+def format_sources(results, url_key='url'):
+    """Build the numbered 'Sources' section appended to summaries, skipping results without a link."""
+    return "\n\nSources:\n" + "".join(
+        f"{i}. {result.get('title', 'Source')}: {result[url_key]}\n"
+        for i, result in enumerate(results, 1)
+        if result.get(url_key)
+    )
+
 def process_web_search(query, session_id=None):
     """Process a web search query and return real-time results."""
     # Try to get from cache first (with short expiration)
     cache_key = f"web_search:{query}"
-    cached_results = cache.get(cache_key)
+    cached_results = cache_get(cache_key)
     
     if cached_results:
-        logger.info(f"Cache hit for web search: {query}")
+        logger.info("Cache hit for web search: %s", query)
         
         # Add response to conversation history if session exists
         if session_id:
@@ -410,24 +760,20 @@ def process_web_search(query, session_id=None):
         
         # Create a summary from the search results
         result_texts = [result.get('snippet', '') for result in search_results]
-        summary = generate_general_summary(result_texts)
+        summary = cached_general_summary(result_texts)
         
         # Format for a user-friendly response
-        formatted_results = []
-        for result in search_results:
-            formatted_results.append({
+        formatted_results = [
+            {
                 'title': result.get('title', 'No title'),
                 'url': result.get('link', '#'),
                 'snippet': result.get('snippet', 'No description available')
-            })
+            }
+            for result in search_results
+        ]
         
         # Ensure the summary includes links to search results
-        links_section = "\n\nSources:\n"
-        for i, result in enumerate(formatted_results):
-            if result.get('url'):
-                links_section += f"{i+1}. {result.get('title', 'Source')}: {result.get('url')}\n"
-            elif result.get('link'):
-                links_section += f"{i+1}. {result.get('title', 'Source')}: {result.get('link')}\n"
+        links_section = format_sources(formatted_results)
         
         response_text = f"Here's what I found online about '{query}':\n\n{summary}{links_section}"
         
@@ -440,7 +786,7 @@ def process_web_search(query, session_id=None):
         }
         
         # Cache for a short time (5 minutes)
-        cache.set(cache_key, final_response, timeout=300)
+        cache_set(cache_key, final_response, timeout=300)
         
         # Add response to conversation history if session exists
         if session_id:
@@ -449,7 +795,7 @@ def process_web_search(query, session_id=None):
         return jsonify(final_response)
         
     except Exception as e:
-        logger.error(f"Error in web search: {str(e)}", exc_info=True)
+        logger.error("Error in web search: %s", e, exc_info=True)
         error_message = f"I had trouble searching the web for '{query}'. Please try a different query or try again later."
         
         if session_id:
@@ -465,10 +811,10 @@ def process_analysis(query, session_id=None):
     """Process an analysis request on a topic."""
     # Try cache first
     cache_key = f"analysis:{query}"
-    cached_results = cache.get(cache_key)
+    cached_results = cache_get(cache_key)
     
     if cached_results:
-        logger.info(f"Cache hit for analysis: {query}")
+        logger.info("Cache hit for analysis: %s", query)
         
         # Add response to conversation history if session exists
         if session_id:
@@ -477,11 +823,11 @@ def process_analysis(query, session_id=None):
         return jsonify(cached_results)
     
     # First get trend data
-    trend_data = fetch_trending_topics(query)
+    trend_data, complete = cached_trending_topics(query)
     
     # If we have no trend data, try a web search
     if not trend_data:
-        logger.info(f"No trend data found, attempting web search for: {query}")
+        logger.info("No trend data found, attempting web search for: %s", query)
         search_results = perform_web_search(query)
         
         if search_results:
@@ -489,35 +835,21 @@ def process_analysis(query, session_id=None):
             snippets = [result.get('snippet', '') for result in search_results]
             analysis_text = analyze_content(query, snippets)
             
-            # Add source links to the analysis if they're not already included
-            links_section = "\n\nSources:\n"
-            for i, result in enumerate(search_results):
-                if result.get('link'):
-                    links_section += f"{i+1}. {result.get('title', 'Source')}: {result.get('link')}\n"
-            
             # Add source links if they're not already in the analysis
-            if "Sources:" not in analysis_text and search_results:
-                analysis_text += links_section
+            if "Sources:" not in analysis_text:
+                analysis_text += format_sources(search_results, 'link')
         else:
             analysis_text = f"I couldn't find any recent information to analyze about '{query}'."
     else:
         # Prepare content for analysis from trend data
-        content_to_analyze = []
-        for item in trend_data:
-            title = item.get('title', '')
-            summary = item.get('summary', '')
-            content_to_analyze.append(f"{title}: {summary}")
+        content_to_analyze = [f"{item.get('title', '')}: {item.get('summary', '')}" for item in trend_data]
         
         # Perform analysis
         analysis_text = analyze_content(query, content_to_analyze)
         
         # Add source links to the analysis if they're not already included
-        if "Sources:" not in analysis_text and trend_data:
-            links_section = "\n\nSources:\n"
-            for i, item in enumerate(trend_data):
-                if item.get('url'):
-                    links_section += f"{i+1}. {item.get('title', 'Source')}: {item.get('url')}\n"
-            analysis_text += links_section
+        if "Sources:" not in analysis_text:
+            analysis_text += format_sources(trend_data)
     
     # Create response format
     response_data = {
@@ -528,8 +860,9 @@ def process_analysis(query, session_id=None):
         'type': 'analysis'
     }
     
-    # Cache the results
-    cache.set(cache_key, response_data, timeout=1800)  # Cache for 30 minutes
+    # Cache the results, unless some sources timed out and may answer next time
+    if complete:
+        cache_set(cache_key, response_data, timeout=1800)  # Cache for 30 minutes
     
     # Add to conversation history if session exists
     if session_id:
@@ -537,58 +870,47 @@ def process_analysis(query, session_id=None):
     
     return jsonify(response_data)
 
-def process_search_query(query, session_id=None):
-    """Process a search query and return results with summaries."""
-    # Try to get from cache first
-    cache_key = f"search_query:{query}"
-    cached_results = cache.get(cache_key)
+def get_cached_search_query(query, session_id=None):
+    """Return the cached response for a search query, recording it in the conversation history."""
+    cached_results = cache_get(f"search_query:{query}")
     
     if cached_results:
-        logger.info(f"Cache hit for query: {query}")
+        logger.info("Cache hit for query: %s", query)
         
         # Add to conversation history if session exists
         if session_id and 'general_summary' in cached_results:
             update_conversation_history(session_id, 'assistant', 
                 f"Here's what I found about '{query}':\n\n{cached_results['general_summary']}")
-            
-        return jsonify(cached_results)
     
-    # If not in cache, fetch new results
-    results = fetch_trending_topics(query)
-    
-    # Process results and generate summaries
-    individual_summaries = []
-    processed_results = []
-    
-    for result in results:
+    return cached_results
+
+def iter_search_results(trends):
+    """Yield (summary, processed result) pairs for trending topics as each one arrives."""
+    for result in trends:
         title = result.get('title', '')
         summary = result.get('summary', '')
         url = result.get('url', '')
         
-        # Create individual summary
-        full_summary = summarize_with_hf(f"{title} {summary}")
-        individual_summaries.append(full_summary)
-        
-        # Ensure URL is included in the summary if not already present
+        # The fetchers already summarized each item, so reuse that instead of summarizing it again;
+        # the processed result also carries the source URL if not already present
+        full_summary = summary
         if url and url not in full_summary:
             full_summary += f"\nSource: {url}"
         
-        # Add to processed results
-        processed_results.append({
+        yield summary, {
             'source': result.get('source', ''),
             'title': title,
             'summary': full_summary,
             'url': url
-        })
-    
+        }
+
+def build_search_response(query, processed_results, individual_summaries, session_id=None, complete=True):
+    """Summarize processed results into the final search response, caching it and updating history."""
     # Generate overall summary
-    general_summary = generate_general_summary(individual_summaries)
+    general_summary = cached_general_summary(individual_summaries)
     
     # Create a section with links for easy reference
-    links_section = "\n\nSources:\n"
-    for i, result in enumerate(processed_results):
-        if result.get('url'):
-            links_section += f"{i+1}. {result.get('title', 'Source')}: {result.get('url')}\n"
+    links_section = format_sources(processed_results)
     
     # Add clean summary and include links - make sure no Kachifo prefix
     personalized_summary = f"Here's what I found about '{query}':\n\n{general_summary}{links_section}"
@@ -602,33 +924,110 @@ def process_search_query(query, session_id=None):
         'type': 'query'
     }
     
-    # Cache the results
-    cache.set(cache_key, final_response, timeout=1800)  # Cache for 30 minutes
+    # Cache the results, unless some sources timed out and may answer next time
+    if complete:
+        cache_set(f"search_query:{query}", final_response, timeout=1800)  # Cache for 30 minutes
     
     # Add to conversation history if session exists
     if session_id:
         update_conversation_history(session_id, 'assistant', personalized_summary)
     
-    return jsonify(final_response)
+    return final_response
 
-@app.route('/search', methods=['GET', 'POST'])
-@rate_limit
-def search_trends():
-    """API endpoint for searching trends."""
+def process_search_query(query, session_id=None):
+    """Process a search query and return results with summaries."""
+    # Try to get from cache first
+    cached_results = get_cached_search_query(query, session_id)
+    if cached_results:
+        return jsonify(cached_results)
+    
+    # If not in cache, fetch new results and generate summaries
+    individual_summaries = []
+    processed_results = []
+    trends, complete = cached_trending_topics(query)
+    for individual_summary, processed_result in iter_search_results(trends):
+        individual_summaries.append(individual_summary)
+        processed_results.append(processed_result)
+    
+    return jsonify(build_search_response(query, processed_results, individual_summaries, session_id, complete))
+
+def stream_search_query(query, session_id=None):
+    """Stream a search query as NDJSON, one line per result followed by the overall summary."""
+    def generate():
+        try:
+            cached_results = get_cached_search_query(query, session_id)
+            if cached_results:
+                for result in cached_results['results']:
+                    yield orjson.dumps({'type': 'result', 'result': result, 'session_id': session_id}) + b"\n"
+                yield orjson.dumps(cached_results) + b"\n"
+                return
+            
+            # Share the buffered path's memoized fetch, keyed by the same normalized query
+            normalized_query = normalize_query(query)
+            trends_key = trending_topics_cache_key(normalized_query)
+            memoized = cache_get(trends_key) if trends_key else None
+            if memoized is not None:
+                source_batches, expected_batches = [(0, memoized[0])], 1
+            else:
+                # Take each source as it completes so the first lines don't wait on the slowest upstream
+                source_batches, expected_batches = iter_trending_topics(normalized_query), len(TREND_SOURCES)
+            
+            trends_by_source = {}
+            for source_index, source_trends in source_batches:
+                trends_by_source[source_index] = source_trends
+                for _, processed_result in iter_search_results(source_trends):
+                    yield orjson.dumps({'type': 'result', 'result': processed_result, 'session_id': session_id}) + b"\n"
+            
+            # Restore source order so the cached response matches the one the buffered path builds
+            trends = [trend for index in sorted(trends_by_source) for trend in trends_by_source[index]]
+            individual_summaries = []
+            processed_results = []
+            for individual_summary, processed_result in iter_search_results(trends):
+                individual_summaries.append(individual_summary)
+                processed_results.append(processed_result)
+            
+            # Sources that timed out are missing, so the response is only cached when all of them answered
+            complete = len(trends_by_source) == expected_batches
+            if memoized is None and trends_key and is_complete_fetch((trends, complete)):
+                cache_set(trends_key, (trends, complete), timeout=memoized_trending_topics.cache_timeout)
+            
+            yield orjson.dumps(build_search_response(query, processed_results, individual_summaries, session_id, complete)) + b"\n"
+        except Exception as e:
+            # Headers are already sent, so report the failure in-band
+            logger.error("Error streaming search query: %s", e, exc_info=True)
+            yield orjson.dumps({
+                'response': "I'm sorry, I encountered an issue processing your request.",
+                'session_id': session_id,
+                'type': 'error'
+            }) + b"\n"
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+def get_query_params():
+    """Read 'q' and 'session_id' from the query string or JSON body, returning (query, session_id, error response)."""
     # Handle both GET and POST requests
     if request.method == 'GET':
-        query = request.args.get('q', '')
-        session_id = request.args.get('session_id', None)
+        params = request.args
     else:
-        data = request.get_json()
-        if not data:
-            return jsonify({'error': 'No data provided'}), 400
-            
-        query = data.get('q', '')
-        session_id = data.get('session_id', None)
+        params = request.get_json(silent=True)
+        if not params:
+            return None, None, (jsonify({'error': 'No data provided'}), 400)
     
+    query = params.get('q', '')
     if not query:
-        return jsonify({'error': 'Query parameter "q" is required'}), 400
+        return None, None, (jsonify({'error': 'Query parameter "q" is required'}), 400)
+    if len(query) > MAX_INPUT_LENGTH:
+        return None, None, (jsonify({'error': INPUT_TOO_LONG_ERROR}), 400)
+    
+    return query, params.get('session_id', None), None
+
+@app.route('/search', methods=['GET', 'POST'])
+@rate_limit
+def search_trends():
+    """API endpoint for searching trends."""
+    query, session_id, error = get_query_params()
+    if error:
+        return error
     
     # Sanitize input and process query
     query = sanitize_input(query)
@@ -638,20 +1037,9 @@ def search_trends():
 @rate_limit
 def analyze_trends():
     """API endpoint for analyzing trends."""
-    # Handle both GET and POST requests
-    if request.method == 'GET':
-        query = request.args.get('q', '')
-        session_id = request.args.get('session_id', None)
-    else:
-        data = request.get_json()
-        if not data:
-            return jsonify({'error': 'No data provided'}), 400
-            
-        query = data.get('q', '')
-        session_id = data.get('session_id', None)
-    
-    if not query:
-        return jsonify({'error': 'Query parameter "q" is required'}), 400
+    query, session_id, error = get_query_params()
+    if error:
+        return error
     
     # Sanitize input and process for analysis
     query = sanitize_input(query)
@@ -661,20 +1049,9 @@ def analyze_trends():
 @rate_limit
 def web_search():
     """API endpoint for web search."""
-    # Handle both GET and POST requests
-    if request.method == 'GET':
-        query = request.args.get('q', '')
-        session_id = request.args.get('session_id', None)
-    else:
-        data = request.get_json()
-        if not data:
-            return jsonify({'error': 'No data provided'}), 400
-            
-        query = data.get('q', '')
-        session_id = data.get('session_id', None)
-    
-    if not query:
-        return jsonify({'error': 'Query parameter "q" is required'}), 400
+    query, session_id, error = get_query_params()
+    if error:
+        return error
     
     # Sanitize input and process web search
     query = sanitize_input(query)
@@ -684,14 +1061,26 @@ def web_search():
 def get_stats():
     """Get basic usage statistics."""
     return jsonify({
-        'daily_usage': daily_usage_count,
-        'active_conversations': len(conversation_store)
+        'daily_usage': get_daily_usage(),
+        'active_conversations': len(conversation_store),
+        'conversation_cache': get_conversation_cache_stats()
+    })
+
+@app.route('/debug/cachestats', methods=['GET'])
+def get_cache_stats():
+    """Expose input-processing cache statistics when debug routes are enabled."""
+    if os.environ.get('ENABLE_DEBUG_ROUTES') != 'true':
+        abort(404)
+    
+    return jsonify({
+        'sanitize_input': sanitize_input.cache_info()._asdict(),
+        'classify_standalone_input': classify_standalone_input.cache_info()._asdict()
     })
 
 @app.route('/clear-history', methods=['POST'])
 def clear_history():
     """Clear conversation history for a session."""
-    data = request.get_json()
+    data = request.get_json(silent=True)
     if not data:
         return jsonify({'error': 'No data provided'}), 400
         
@@ -701,9 +1090,11 @@ def clear_history():
         return jsonify({'success': True, 'message': 'No active session found'})
     
     # Clear history but keep system message
-    system_message = conversation_store[session_id]['history'][0]
-    conversation_store[session_id]['history'] = [system_message]
-    conversation_store[session_id]['last_updated'] = time.time()
+    with conversation_lock:
+        conversation = conversation_store.get(session_id)
+        if conversation is not None:
+            conversation['history'] = conversation['history'][:1]
+            conversation['last_updated'] = time.time()
     
     return jsonify({'success': True, 'message': 'Conversation history cleared'})
 
@@ -714,7 +1105,7 @@ def handle_exception(e):
         return e
     
     # Log unexpected errors
-    logger.error(f"Unhandled exception: {str(e)}", exc_info=True)
+    logger.error("Unhandled exception: %s", e, exc_info=True)
     
     # Return user-friendly error with Kachifo personality
     return jsonify({
@@ -722,10 +1113,6 @@ def handle_exception(e):
         'type': 'error'
     }), 500
 
-# Initialize HuggingFace clients
-if not initialize_inference_clients():
-    logger.warning("Failed to initialize some or all HuggingFace models. Some features may be limited.")
-
 if __name__ == '__main__':
     # Get port from environment variable or use default
     port = int(os.environ.get('PORT', 5000))
@@ -0,0 +1,23 @@
+import os
+
+# Bind to the port provided by the platform
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+
+# Threaded workers so requests waiting on Redis and the external APIs overlap
+worker_class = 'gthread'
+workers = int(os.environ.get('WEB_CONCURRENCY', max(1, (os.cpu_count() or 2) - 1)))
+threads = int(os.environ.get('GUNICORN_THREADS', 2))
+
+# Import the app once in the master and share it copy-on-write with the workers
+preload_app = True
+
+# Keep worker heartbeat files in memory instead of on disk
+worker_tmp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+# Upstream sources are given time to answer before a worker is considered stuck
+timeout = 60
+
+def post_fork(server, worker):
+    """Give each worker its own log queue and listener, since the thread and queue lock do not survive the fork."""
+    from app import restart_log_listener
+    restart_log_listener()
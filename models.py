@@ -5,6 +5,8 @@ from datetime import datetime, date
 
 class TrendData:
     """In-memory representation of trend data"""
+    __slots__ = ('query', 'category', 'title', 'timestamp')
+
     def __init__(self, query, category, title):
         self.query = query
         self.category = category
@@ -13,12 +15,16 @@ class TrendData:
 
 class UserQueryData:
     """In-memory representation of user query data"""
+    __slots__ = ('query', 'timestamp')
+
     def __init__(self, query):
         self.query = query
         self.timestamp = datetime.utcnow()
 
 class UsageData:
     """In-memory representation of usage statistics"""
+    __slots__ = ('date', 'count')
+
     def __init__(self):
         self.date = date.today()
         self.count = 0